@@ -84,7 +84,10 @@ class ExtractTextFromImageUsingLLM(BaseModel):
     Model for extracting specific information from an image using an LLM.
     """
 
-    input_image: str = Field(..., description="Path to the image file.")
+    input_image: str | List[str] = Field(
+        ...,
+        description="Path to the image file, or a list of image paths to query together in one request.",
+    )
     query: str = Field(
         ...,
         description="""Query specifying what to extract from the image . Specify with or without spaces.).
@@ -97,7 +100,7 @@ class ExtractTextFromImageUsingLLM(BaseModel):
     )
     image_format: str = Field(
         ...,
-        description='Format of the image (e.g., "jpeg", "png"). Defaults to "jpeg"'
+        description='Format of the image (e.g., "jpeg", "png"). Defaults to "jpeg". Only used for paths whose extension does not identify the format.'
     )
 
 
@@ -156,6 +159,7 @@ class CommitMessageToGitRepo(BaseModel):
 class Git_Clone(BaseModel):
     url_repo: str = Field(..., description="URL of the git repository to clone")
     output_dir: str = Field(..., description="The directory where the repository will be cloned.")
+    full_history: bool = Field(..., description="Whether to clone the full commit history and all branches. Use false unless older commits or other branches are needed.")
 tools = [
     pydantic_function_tool(CountTheNumberofDaysAndSave),
     pydantic_function_tool(SortContacts),
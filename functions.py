@@ -1,15 +1,28 @@
+import asyncio
+import atexit
+import base64
+import hashlib
+import heapq
 import json
+import mmap
 import os
+import re
+import shutil
 import sqlite3
 import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
 from typing import Dict, List, Optional, Tuple
 
 import duckdb
 import numpy as np
 import pandas as pd
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 
 load_dotenv(".env")
 
@@ -19,59 +32,163 @@ API_BASE_URL = "https://aiproxy.sanand.workers.dev/openai/v1"
 
 client_local = OpenAI(api_key=AIPROXY_TOKEN, base_url=API_BASE_URL)
 
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_BATCH_SIZE = 256
+EMBEDDING_BATCH_TOKENS = 250_000
+EMBEDDING_MAX_CONCURRENCY = 16
+SIMILARITY_BLOCK_SIZE = 256
+
+LLM_MODEL = "gpt-4o-mini"
+LLM_CACHE_FILE = os.getenv("LLM_CACHE_FILE", "_llm_cache.sqlite")
+
+PRETTIER_CACHE_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "llm-automation-agent"
+)
+_PRETTIER_BINARIES: Dict[str, str] = {}
+
+# Open SQLite connections reused by run_sql_query, keyed by resolved path
+_SQLITE_CONNECTIONS: Dict[str, Tuple[Optional[int], sqlite3.Connection]] = {}
+
+# Shapes of the date formats count_days_and_save understands, keyed by name, each
+# with the formats to try in order for lines of that shape
+DATE_FORMATS: Dict[str, Tuple[str, List[str]]] = {
+    "iso": (r"\d{4}-\d{1,2}-\d{1,2}", ["%Y-%m-%d"]),  # 2025-02-13
+    "day_mon": (r"\d{1,2}-[A-Za-z]{3}-\d{4}", ["%d-%b-%Y"]),  # 15-Sep-2002
+    "slash": (r"\d{1,2}/\d{1,2}/\d{4}", ["%m/%d/%Y", "%d/%m/%Y"]),  # 02/13/2025, 13/02/2025
+    "month_name": (r"[A-Za-z]+ \d{1,2}, \d{4}", ["%B %d, %Y", "%b %d, %Y"]),  # February 13, 2025, Oct 31, 2001
+    "slash_time": (r"\d{4}/\d{1,2}/\d{1,2} \d{1,2}:\d{2}:\d{2}", ["%Y/%m/%d %H:%M:%S"]),  # 2019/04/01 10:48:50
+    "iso_time": (r"\d{4}-\d{1,2}-\d{1,2} \d{1,2}:\d{2}:\d{2}", ["%Y-%m-%d %H:%M:%S"]),  # 2019-04-01 10:48:50
+    "day_mon_time": (r"\d{1,2}-[A-Za-z]{3}-\d{4} \d{1,2}:\d{2}:\d{2}", ["%d-%b-%Y %H:%M:%S"]),  # 15-Sep-2002 10:48:50
+}
+
+# One alternation with a named group per shape, so a single match classifies a line
+DATE_SHAPE_RE = re.compile(
+    "|".join(f"(?P<{name}>{pattern})" for name, (pattern, _) in DATE_FORMATS.items())
+)
+
+# Seconds a tool's subprocess may run before it is killed
+COMMAND_TIMEOUT = 300
+
+# Image formats recognised from file extensions in extract_text_from_image_using_llm
+IMAGE_EXTENSION_FORMATS = {
+    ".jpg": "jpeg",
+    ".jpeg": "jpeg",
+    ".png": "png",
+    ".webp": "webp",
+}
+
+# Characters kept from each of stdout/stderr of a shell command
+MAX_COMMAND_OUTPUT = 1 << 20
+
+
+def _run(
+    command: List[str], timeout: Optional[float] = COMMAND_TIMEOUT, **kwargs
+) -> subprocess.CompletedProcess:
+    """
+    Runs a command without a shell.
+
+    The executable is resolved to an absolute path up front, which lets CPython
+    start it with posix_spawn/vfork instead of a full fork of this process.
+
+    :param command: Program and arguments.
+    :param timeout: Seconds before the command is killed, or None to wait indefinitely.
+    :param kwargs: Passed through to subprocess.run.
+    """
+    executable = shutil.which(command[0])
+    if executable is None:
+        raise FileNotFoundError(f"Command not found: {command[0]}")
+    return subprocess.run(
+        [executable, *command[1:]], timeout=timeout, close_fds=True, **kwargs
+    )
+
 
 def install_and_run_script(script_url: str, email: str) -> List[Dict | str]:
     command = ["uv", "run", script_url, email]
-    result = subprocess.run(
+    result = _run(
         command,
-        shell=True,
         check=True,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
         text=True,
     )
-    subprocess.run(command)
     return [
         {"response": "Task Done Successfully"},
         {"command": command},
-        {"output": result},
+        {"output": result.stdout.strip()},
     ]
 
 
+def _prettier_binary(prettier_version: str) -> str:
+    """Returns the path to a locally installed Prettier, installing it on first use."""
+    if prettier_version not in _PRETTIER_BINARIES:
+        prefix = os.path.join(PRETTIER_CACHE_DIR, f"prettier-{prettier_version}")
+        binary = os.path.join(prefix, "node_modules", ".bin", "prettier")
+        if not os.path.exists(binary):
+            _run(
+                ["npm", "install", "--prefix", prefix, f"prettier@{prettier_version}"],
+                check=True,
+                timeout=None,
+            )
+        _PRETTIER_BINARIES[prettier_version] = binary
+    return _PRETTIER_BINARIES[prettier_version]
+
+
 def format_markdown_prettier(file_path: str, prettier_version: str):
-    command = ["npx","-y", f"prettier@{prettier_version}", "--write", file_path]
-    subprocess.run(command)
+    # Run the pinned binary directly; npx would hit the registry on every call
+    command = [_prettier_binary(prettier_version), "--write", file_path]
+    _run(command)
     return [{"response": "Task Done Successfully"}]
 
 
-def count_days_and_save(day: str, input_file: str, output_file: str):
-    # List of possible date formats (expanded)
-    date_formats = [
-        "%Y-%m-%d",  # 2025-02-13
-        "%d-%b-%Y",  # 15-Sep-2002
-        "%m/%d/%Y",  # 02/13/2025
-        "%d/%m/%Y",  # 13/02/2025
-        "%B %d, %Y",  # February 13, 2025
-        "%Y/%m/%d %H:%M:%S",  # 2019/04/01 10:48:50
-        "%Y-%m-%d %H:%M:%S",  # 2019-04-01 10:48:50
-        "%d-%b-%Y %H:%M:%S",  # 15-Sep-2002 10:48:50
-        "%b %d, %Y",  # Oct 31, 2001
+def _date_shape(date_str: str) -> Optional[str]:
+    match = DATE_SHAPE_RE.fullmatch(date_str)
+    return match.lastgroup if match else None
+
+
+def _strptime_any(date_str: str) -> datetime:
+    shape = _date_shape(date_str)
+    formats = DATE_FORMATS[shape][1] if shape else [
+        fmt for _, shape_formats in DATE_FORMATS.values() for fmt in shape_formats
     ]
+    for fmt in formats:
+        try:
+            return datetime.strptime(date_str, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"Date '{date_str}' does not match any known formats.")
 
-    def parse_date(date_str: str):
-        for fmt in date_formats:
-            try:
-                return datetime.strptime(date_str.strip(), fmt)
-            except ValueError:
-                continue
-        raise ValueError(f"Date '{date_str}' does not match any known formats.")
 
+def count_days_and_save(day: str, input_file: str, output_file: str):
     with open(input_file, "r") as infile:
-        dates = infile.readlines()
+        dates = pd.Series(infile.read().splitlines(), dtype=object).str.strip()
+    dates = dates[dates != ""]
+
+    # Classify every line in a single regex pass, then parse each group with its exact format.
+    # Only weekday names are kept, which sidesteps datetime64 resolution and range limits.
+    shapes = dates.map(_date_shape)
+    weekdays = pd.Series(None, index=dates.index, dtype=object)
+    for shape, index in dates.groupby(shapes).groups.items():
+        for fmt in DATE_FORMATS[shape][1]:
+            parsed = pd.to_datetime(dates[index], format=fmt, errors="coerce")
+            weekdays[index] = parsed.dt.day_name()
+            index = index[parsed.isna().to_numpy()]
+            if index.empty:
+                break
+
+    # Let pandas infer the format of anything the known shapes did not cover
+    unparsed = weekdays.isna()
+    if unparsed.any():
+        parsed = pd.to_datetime(dates[unparsed], format="mixed", errors="coerce")
+        weekdays[unparsed] = parsed.dt.day_name()
+
+    # datetime64[ns] only spans the years 1677-2262; strptime covers the rest line by line
+    unparsed = weekdays.isna()
+    if unparsed.any():
+        weekdays[unparsed] = dates[unparsed].map(
+            lambda date: _strptime_any(date).strftime("%A")
+        )
 
-    day_count = sum(
-        1 for date in dates if parse_date(date).strftime("%A").lower() == day.lower()
-    )
+    day_count = int((weekdays.str.lower() == day.lower()).sum())
 
     with open(output_file, "w") as outfile:
         outfile.write(str(day_count))
@@ -83,59 +200,127 @@ def sort_contacts(input_file: str, output_file: str, sort_keys: List[str]):
     with open(input_file, "r") as infile:
         contacts = json.load(infile)
 
-    sorted_contacts = sorted(
-        contacts, key=lambda x: tuple(x[key].lower() for key in sort_keys if key in x)
-    )
+    # Sort in place rather than building a second list
+    contacts.sort(key=lambda x: tuple(x[key].lower() for key in sort_keys if key in x))
 
     with open(output_file, "w") as outfile:
-        json.dump(sorted_contacts, outfile, indent=4)
+        # Serialize in one call: json.dump issues a write() per token when indenting
+        outfile.write(json.dumps(contacts, indent=4))
 
     return [{"response": "Task Done Successfully"}]
 
 
+def _first_heading(file_path: str, tag_re: re.Pattern) -> Optional[str]:
+    with open(file_path, "r") as f:
+        match = tag_re.search(f.read())
+    return match.group(1) if match else None
+
+
 def generate_markdown_index(directory: str, output_file: str, tags: List[str]):
     index: Dict[str, str] = {}
 
-    for root, _, files in os.walk(directory):
-        for file in files:
-            if file.endswith(".md"):
-                file_path = os.path.join(root, file)
-                relative_path = os.path.relpath(file_path, directory)
-
-                with open(file_path, "r") as f:
-                    for line in f:
-                        line = line.strip()
-                        for tag in tags:
-                            if line.startswith(tag + " "):
-                                title = line[len(tag) :].strip()
-                                index[relative_path] = title
-                                break
-                        if relative_path in index:
-                            break
+    file_paths = [
+        os.path.join(root, file)
+        for root, _, files in os.walk(directory)
+        for file in files
+        if file.endswith(".md")
+    ]
+
+    if tags:
+        # First line that starts with one of the tags followed by a space
+        tag_re = re.compile(
+            r"^[^\S\n]*(?:" + "|".join(map(re.escape, tags)) + r") [^\S\n]*(.*\S)",
+            re.MULTILINE,
+        )
+
+        # Reading files is I/O-bound, so threads overlap the waits
+        with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor:
+            titles = executor.map(lambda path: _first_heading(path, tag_re), file_paths)
+            for file_path, title in zip(file_paths, titles):
+                if title is not None:
+                    index[os.path.relpath(file_path, directory)] = title
 
     with open(output_file, "w") as outfile:
-        json.dump(index, outfile, indent=4)
+        outfile.write(json.dumps(index, indent=4))
     return [{"response": "Task Done Successfully"}]
 
 
+def _cache_key(*parts: str | bytes) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part.encode("utf-8") if isinstance(part, str) else part
+        # Length-prefix each part so ("ab", "c") and ("a", "bc") hash differently
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def _open_llm_cache() -> sqlite3.Connection:
+    conn = sqlite3.connect(LLM_CACHE_FILE)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, response TEXT NOT NULL)"
+    )
+    return conn
+
+
+@lru_cache(maxsize=256)
+def _cached_llm_response(key: str) -> str:
+    # Misses raise instead of returning None so lru_cache only remembers hits
+    try:
+        with closing(_open_llm_cache()) as conn:
+            row = conn.execute(
+                "SELECT response FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+    except sqlite3.Error:
+        # An unreadable cache is treated as a miss
+        row = None
+    if row is None:
+        raise KeyError(key)
+    return row[0]
+
+
+def _complete_with_cache(key: str, messages: List[Dict]) -> str:
+    """
+    Returns the stripped completion for the messages, reusing a stored response for the same key.
+
+    :param key: Cache key covering the model and every input that shapes the response.
+    :param messages: Chat messages to send to the model on a cache miss.
+    :return: The response text.
+    """
+    try:
+        return _cached_llm_response(key)
+    except KeyError:
+        pass
+
+    response = client_local.chat.completions.create(model=LLM_MODEL, messages=messages)
+    text = response.choices[0].message.content.strip()
+
+    try:
+        with closing(_open_llm_cache()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response) VALUES (?, ?)",
+                (key, text),
+            )
+    except sqlite3.Error:
+        # Failing to store the response must not discard it
+        pass
+    return text
+
+
 def extract_using_llm(input_file: str, output_file: str, instructions: str):
 
     with open(input_file, "r") as file:
         content = file.read()
 
-    response = client_local.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {
-                "role": "system",
-                "content": "You are an assistant that extracts information based on user instructions.",
-            },
+    system_message = "You are an assistant that extracts information based on user instructions."
+    extracted_info = _complete_with_cache(
+        _cache_key(LLM_MODEL, system_message, instructions, content),
+        [
+            {"role": "system", "content": system_message},
             {"role": "user", "content": f"{instructions}\n\nText:\n{content}"},
         ],
     )
 
-    extracted_info = response.choices[0].message.content.strip()
-
     with open(output_file, "w") as file:
         file.write(extracted_info)
     return [
@@ -146,6 +331,43 @@ def extract_using_llm(input_file: str, output_file: str, instructions: str):
     ]
 
 
+def _sqlite_connection(database_file: str) -> sqlite3.Connection:
+    """
+    Returns a connection to the SQLite file that is kept open across queries.
+
+    The connection is reopened if the file has been replaced since it was opened.
+    Autocommit mode keeps a write query from holding the lock until the next call.
+    """
+    path = os.path.realpath(database_file)
+    inode = os.stat(path).st_ino if os.path.exists(path) else None
+
+    cached = _SQLITE_CONNECTIONS.get(path)
+    if cached is not None:
+        cached_inode, conn = cached
+        if cached_inode == inode:
+            return conn
+        conn.close()
+
+    conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    _SQLITE_CONNECTIONS[path] = (inode, conn)
+    return conn
+
+
+@atexit.register
+def _close_sqlite_connections():
+    for _, conn in _SQLITE_CONNECTIONS.values():
+        conn.close()
+    _SQLITE_CONNECTIONS.clear()
+
+
+def _format_rows(result: pd.DataFrame) -> List[str]:
+    # itertuples yields plain tuples; iterrows would box every row into a Series
+    return [
+        " ".join(map(str, row)) + "\n"
+        for row in result.itertuples(index=False, name=None)
+    ]
+
+
 def run_sql_query(
     database_file: str,
     query: str,
@@ -155,42 +377,134 @@ def run_sql_query(
 ):
 
     if database_type == "sqlite":
-        conn = sqlite3.connect(database_file)
+        conn = _sqlite_connection(database_file)
+        try:
+            cursor = conn.execute(query)
+            columns = [column[0] for column in cursor.description or []]
+            result = pd.DataFrame.from_records(cursor.fetchall(), columns=columns)
+        except Exception as e:
+            raise ValueError(f"Error executing query: {e}")
     elif database_type == "duckdb":
+        # Not pooled: an open DuckDB connection locks the file against other processes
         conn = duckdb.connect(database_file)
+        try:
+            # DuckDB hands back its columnar result directly, without per-row DB-API boxing
+            result = conn.execute(query).fetch_df()
+        except Exception as e:
+            raise ValueError(f"Error executing query: {e}")
+        finally:
+            conn.close()
     else:
         raise ValueError("Unsupported database type. Use 'sqlite' or 'duckdb'.")
 
-    try:
-        result = pd.read_sql_query(query, conn)
-    except Exception as e:
-        conn.close()
-        raise ValueError(f"Error executing query: {e}")
-    finally:
-        conn.close()
-
     # Save output if requested
     if output_file:
         if output_format == "csv":
             result.to_csv(output_file, index=False, header=True)  # CSV includes headers
         elif output_format == "txt":
             with open(output_file, "w") as file:
-                for _, row in result.iterrows():
-                    # Write rows without column names
-                    file.write(" ".join(map(str, row.values)) + "\n")
+                # Write rows without column names
+                file.writelines(_format_rows(result))
         else:
             raise ValueError("Unsupported output format. Use 'csv' or 'txt'.")
     else:
-        for _, row in result.iterrows():
-            print(" ".join(map(str, row.values)))
-            return {
-                "output_saved_to_location": output_file,
-                "response": "Task Done Successfully.",
-            }
+        print("".join(_format_rows(result)), end="")
 
     return [{"response": result}]
 
 
+async def _embed(items: List[str]) -> np.ndarray:
+    """
+    Embeds the items in concurrent mini-batches and returns a float32 matrix in input order.
+
+    Items are sorted by length and packed into batches under the per-request item
+    and token limits, so each request carries similarly sized inputs.
+    Rate-limit (429) and transient errors are retried by the client.
+    """
+    # UTF-8 byte length bounds the token count from above (every token is at least one byte)
+    token_bounds = [len(item.encode("utf-8")) for item in items]
+    order = sorted(range(len(items)), key=lambda idx: token_bounds[idx], reverse=True)
+
+    # Greedily pack the sorted items into batches within the item and token limits
+    batches: List[List[int]] = []
+    batch_tokens = 0
+    for idx in order:
+        if (
+            not batches
+            or len(batches[-1]) >= EMBEDDING_BATCH_SIZE
+            or batch_tokens + token_bounds[idx] > EMBEDDING_BATCH_TOKENS
+        ):
+            batches.append([])
+            batch_tokens = 0
+        batches[-1].append(idx)
+        batch_tokens += token_bounds[idx]
+    semaphore = asyncio.Semaphore(EMBEDDING_MAX_CONCURRENCY)
+
+    async with AsyncOpenAI(
+        api_key=AIPROXY_TOKEN, base_url=API_BASE_URL, max_retries=5
+    ) as client:
+
+        async def embed_batch(batch: List[int]):
+            async with semaphore:
+                # base64 carries the raw float32 bytes, skipping a list of Python floats per vector
+                response = await client.embeddings.create(
+                    input=[items[idx] for idx in batch],
+                    model=EMBEDDING_MODEL,
+                    encoding_format="base64",
+                )
+            vectors = np.stack(
+                [
+                    np.frombuffer(base64.b64decode(data.embedding), dtype=np.float32)
+                    for data in sorted(response.data, key=lambda d: d.index)
+                ]
+            )
+            return batch, vectors
+
+        results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
+
+    embeddings = np.empty((len(items), results[0][1].shape[1]), dtype=np.float32)
+    for batch, vectors in results:
+        embeddings[batch] = vectors
+    return embeddings
+
+
+def _run_async(coro):
+    """Runs a coroutine to completion, even when called from inside a running event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    # The FastAPI handler calls tools synchronously from its event loop, so the
+    # coroutine gets a fresh loop on a worker thread instead.
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+def _most_similar_pair(
+    embeddings: np.ndarray, block_size: int = SIMILARITY_BLOCK_SIZE
+) -> Tuple[int, int]:
+    """
+    Returns the indices (i, j), i < j, of the pair of rows with the largest dot product.
+
+    Rows are compared in blocks against the rows after them, so only the upper
+    triangle is computed and at most block_size x N scores are held at once.
+    """
+    best_score, best_pair = -np.inf, (0, 1)
+    for start in range(0, len(embeddings), block_size):
+        block = embeddings[start : start + block_size]
+        scores = block @ embeddings[start:].T
+
+        # Drop self-similarity and pairs already covered by an earlier row
+        rows, cols = np.indices(scores.shape, sparse=True)
+        scores[cols <= rows] = -np.inf
+
+        row, col = np.unravel_index(np.argmax(scores), scores.shape)
+        if scores[row, col] > best_score:
+            best_score, best_pair = scores[row, col], (start + row, start + col)
+    return best_pair
+
+
 def find_most_similar_texts(
     input_file: str, max_items: int = 1000, output_file: Optional[str] = None
 ) -> Tuple[str, str]:
@@ -214,21 +528,12 @@ def find_most_similar_texts(
 
     # Generate embeddings for all text items
     try:
-        response = client_local.embeddings.create(
-            input=items, model="text-embedding-3-small"
-        )
-        embeddings = np.array([data.embedding for data in response.data])
+        embeddings = _run_async(_embed(items))
     except Exception as e:
         raise ValueError(f"Error while generating embeddings: {e}")
 
-    # Compute dot product similarity between all pairs of embeddings
-    similarity = np.dot(embeddings, embeddings.T)
-
-    # Create mask to ignore diagonal (self-similarity)
-    np.fill_diagonal(similarity, -np.inf)
-
-    # Get indices of maximum similarity
-    i, j = np.unravel_index(np.argmax(similarity), similarity.shape)
+    # Embeddings are unit-normalized, so the dot product is the cosine similarity
+    i, j = _most_similar_pair(embeddings)
 
     most_similar_pair = (items[i], items[j])
 
@@ -243,16 +548,30 @@ def find_most_similar_texts(
     ]
 
 
+def _encode_image(image_path: str) -> Tuple[str, str]:
+    """
+    Returns the base64 text of an image file and the SHA-256 hex digest of its bytes.
+
+    The file is memory-mapped, so its bytes are encoded and hashed without first
+    being copied into a separate buffer.
+    """
+    with open(image_path, "rb") as image_file:
+        if os.fstat(image_file.fileno()).st_size == 0:
+            raise ValueError(f"Image file '{image_path}' is empty.")
+        with mmap.mmap(image_file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return base64.b64encode(mm).decode("ascii"), hashlib.sha256(mm).hexdigest()
+
+
 def extract_text_from_image_using_llm(
-    input_image: str, query: str, output_file: Optional[str] = None, image_format: str = "jpeg"
+    input_image: str | List[str], query: str, output_file: Optional[str] = None, image_format: str = "jpeg"
 ) -> str:
     """
-    Extracts specific information from an image using an LLM based on the provided query.
+    Extracts specific information from one or more images using an LLM based on the provided query.
 
-    :param input_image: Path to the image file.
+    :param input_image: Path to the image file, or a list of paths to send together in a single request.
     :param query: Query specifying what to extract from the image.
     :param output_file: (Optional) Path to the file to write the extracted text. If None, no file is written.
-    :param image_format: Format of the image (e.g., "jpeg", "png"). Defaults to "jpeg".
+    :param image_format: Format of the image (e.g., "jpeg", "png"), used for any path whose extension does not identify it. Defaults to "jpeg".
     :return: Extracted text as a string.
     """
     # Validate image format
@@ -260,39 +579,48 @@ def extract_text_from_image_using_llm(
     if image_format.lower() not in supported_formats:
         raise ValueError(f"Unsupported image format: {image_format}. Supported formats are: {supported_formats}")
 
+    input_images = [input_image] if isinstance(input_image, str) else list(input_image)
+    if not input_images:
+        raise ValueError("At least one image is required.")
+
     # Convert the image to base64 (LLMs often accept images in base64 encoding for APIs)
-    import base64
+    encoded_images = [_encode_image(image_path) for image_path in input_images]
 
-    with open(input_image, "rb") as image_file:
-        image_base64 = base64.b64encode(image_file.read()).decode("utf-8")
+    # Set each image's MIME type from its extension, falling back to the image format
+    mime_types = []
+    for image_path in input_images:
+        extension = os.path.splitext(image_path)[1].lower()
+        mime_types.append(f"image/{IMAGE_EXTENSION_FORMATS.get(extension, image_format.lower())}")
 
-    # Set the MIME type based on the image format
-    mime_type = f"image/{image_format.lower()}"
+    system_message = "You are a helpful assistant that extracts information from images. Don't add any comments in the answer."
+
+    # All images go in one request instead of one round trip per image
+    content = [{"type": "text", "text": query}]
+    for mime_type, (image_base64, _) in zip(mime_types, encoded_images):
+        content.append(
+            {
+                "type": "image_url",
+                "image_url": {
+                    "url": f"data:{mime_type};base64,{image_base64}",
+                },
+            }
+        )
 
     # Query the LLM
     try:
-        response = client_local.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful assistant that extracts information from images. Don't add any comments in the answer.",
-                },
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": query},
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:{mime_type};base64,{image_base64}",
-                            },
-                        },
-                    ],
-                },
+        extracted_text = _complete_with_cache(
+            _cache_key(
+                LLM_MODEL,
+                system_message,
+                query,
+                *mime_types,
+                *(digest for _, digest in encoded_images),
+            ),
+            [
+                {"role": "system", "content": system_message},
+                {"role": "user", "content": content},
             ],
         )
-        extracted_text = response.choices[0].message.content.strip()
     except Exception as e:
         raise ValueError(f"Error while extracting text using LLM: {e}")
 
@@ -313,24 +641,23 @@ def extract_text_from_image_using_llm(
 def write_recent_logs(
     directory: str, output_file: str, num_files: int, num_lines: int, extension: str
 ):
-    # Get all files with the specified extension in the directory
-    files = [
-        os.path.join(directory, file)
-        for file in os.listdir(directory)
-        if file.endswith(extension)
-    ]
+    # scandir gives the file type from the directory read itself; only the mtime needs a stat per file
+    with os.scandir(directory) as entries:
+        files = [
+            (entry.stat().st_mtime, entry.path)
+            for entry in entries
+            if entry.name.endswith(extension) and entry.is_file()
+        ]
 
     # Get the most recent files based on modification time
-    recent_files = sorted(files, key=lambda f: os.path.getmtime(f), reverse=True)[
-        :num_files
-    ]
+    recent_files = [path for _, path in heapq.nlargest(num_files, files)]
 
     # Extract the specified number of lines from each file
     recent_logs = []
     for file_path in recent_files:
-        with open(file_path, "r") as file:
-            for _ in range(num_lines):
-                line = file.readline().strip()
+        with open(file_path, "r", buffering=1 << 16) as file:
+            for line in islice(file, num_lines):
+                line = line.strip()
                 if not line:  # Stop if there are no more lines
                     break
                 recent_logs.append(line)
@@ -343,30 +670,61 @@ def write_recent_logs(
     ]
 
 
+def _collect_tail(stream, limit: int) -> Tuple[str, bool]:
+    """Reads a text stream to the end, keeping only its last `limit` characters."""
+    lines: deque = deque()
+    size = 0
+    truncated = False
+    for line in stream:
+        lines.append(line)
+        size += len(line)
+        while size > limit:
+            truncated = True
+            dropped = lines.popleft()
+            size -= len(dropped)
+            if not lines:
+                # A single line longer than the limit: keep its end
+                lines.append(dropped[-limit:])
+                size = limit
+    return "".join(lines), truncated
+
+
 def run_terminal_command(command: str):
 
     try:
-        # Execute the shell command with subprocess.run for safety
-        result = subprocess.run(
+        # Stream both pipes as the command runs so verbose output is capped instead of buffered whole
+        with subprocess.Popen(
             command,
             shell=True,
-            check=True,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             text=True,
-        )
+            errors="replace",
+            bufsize=1,
+        ) as proc, ThreadPoolExecutor(max_workers=1) as executor:
+            stderr_future = executor.submit(_collect_tail, proc.stderr, MAX_COMMAND_OUTPUT)
+            stdout, stdout_truncated = _collect_tail(proc.stdout, MAX_COMMAND_OUTPUT)
+            stderr, stderr_truncated = stderr_future.result()
+            returncode = proc.wait()
+
+        if stdout_truncated:
+            stdout = f"[output truncated to the last {MAX_COMMAND_OUTPUT} characters]\n{stdout}"
+        if stderr_truncated:
+            stderr = f"[error output truncated to the last {MAX_COMMAND_OUTPUT} characters]\n{stderr}"
+
+        if returncode != 0:
+            # Return error details if command execution fails
+            return [
+                {
+                    "status": "error",
+                    "output": stdout.strip() or None,
+                    "error": stderr.strip()
+                    or f"Command '{command}' returned non-zero exit status {returncode}.",
+                }
+            ]
 
         # Return successful execution details
-        return [{"status": "success", "output": result.stdout.strip(), "error": None}]
-    except subprocess.CalledProcessError as e:
-        # Return error details if command execution fails
-        return [
-            {
-                "status": "error",
-                "output": e.stdout.strip() if e.stdout else None,
-                "error": e.stderr.strip() if e.stderr else str(e),
-            }
-        ]
+        return [{"status": "success", "output": stdout.strip(), "error": None}]
     except Exception as e:
         # Handle other unexpected exceptions
         return [{"status": "error", "output": None, "error": str(e)}]
@@ -389,24 +747,32 @@ def commit_to_git_repo(commit_message: str, path_to_repo: str):
             return (f"The path '{path_to_repo}' is not a valid git repository.")
 
         # Stage all changes
-        subprocess.run(["git", "add", "."], cwd=path_to_repo, check=True)
+        # git -C instead of cwd=, which would rule out posix_spawn
+        _run(["git", "-C", path_to_repo, "add", "."], check=True)
 
         # Commit changes
-        subprocess.run(["git", "commit", "-m", commit_message], cwd=path_to_repo, check=True)
+        _run(["git", "-C", path_to_repo, "commit", "-m", commit_message], check=True)
 
         return (f"Successfully committed changes with message: {commit_message}")
     except Exception as e:
         return (f"Error committing to repository: {e}")
     
-def clone_git_repo(url_repo: str, output_dir: str):
+def clone_git_repo(url_repo: str, output_dir: str, full_history: bool = False):
     """
     Clone a Git repository to the specified directory.
 
     :param url_repo: URL of the repository to clone.
     :param output_dir: Local directory to clone the repository into.
+    :param full_history: Clone every commit and branch instead of a shallow copy of the default branch.
     """
     try:
-        subprocess.run(["git", "clone", url_repo, output_dir], check=True)
+        command = ["git", "clone"]
+        if not full_history:
+            # Only the latest commit of one branch; blobs are fetched as checkout needs them
+            command += ["--depth=1", "--filter=blob:none", "--single-branch"]
+        command += [url_repo, output_dir]
+        env = {**os.environ, "GIT_HTTP_MAX_REQUESTS": "16"}
+        _run(command, check=True, env=env, timeout=None)
         return (f"Successfully cloned repository from {url_repo} to {output_dir}")
     except Exception as e:
         return (f"Error cloning repository: {e}")
\ No newline at end of file